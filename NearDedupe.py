@@ -0,0 +1,271 @@
+import re
+import sys
+import zlib
+import numpy as np
+import pandas as pd
+
+# 输入输出文件（接在 MergeCSV.py 之后运行）
+input_file = "merged_unique.csv"
+cluster_file = "near_duplicates.csv"   # 近重复簇明细，人工复核后再 apply
+output_file = "merged_dedup.csv"
+
+# MinHash / LSH 参数：释义签名和拼写签名各分 16 个 band × 4 行，候选召回阈值约 0.5，
+# 候选对再用下面的条件逐一校验
+NUM_PERM = 64
+BANDS = 16
+MEANING_THRESHOLD = 0.6   # 无词形规则可依时，释义的估计 Jaccard 相似度下限
+WORD_THRESHOLD = 0.35     # 无词形规则可依时，单词拼写的估计 Jaccard 相似度下限
+MEANING_VETO = 0.02       # 符合词形规则时，释义 Jaccard 低于此值视为无关词（如 new / news）
+MIN_PREFIX = 4            # 同词根变体需共享的最短前缀，用于排除 dis-/inter-/im- 等前缀派生词
+REPRESENTATIVE = "shortest"  # 每簇建议保留：shortest（最短，通常是原形）或 first（最先出现的）
+
+_PRIME = 4294967311  # 大于 2^32 的素数
+_rng = np.random.RandomState(42)  # 固定种子，保证每次结果一致
+_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+# 释义中的交叉引用：（等于X）、（X的复数）、（X的第三人称单数）。
+# 过去式/现在分词常常另有独立词义（found、abode、devastating），不作为直接匹配
+_REF_EQUAL = re.compile(r"等于\s*([a-z][a-z\-' ]*?)\s*[）)]")
+_REF_FORM = re.compile(r"([a-z][a-z\-]*)的(?:复数|第三人称单数)")
+_REF_PAREN = re.compile(r"[（(][^（）()]*(?:等于|的复数|的过去|的现在分词|的ing形式|的第三人称)[^（）()]*[）)]")
+
+# 英式拼写 -> 美式拼写，只作用于词尾
+_SPELLING = [
+    (re.compile(r"is(e|es|ed|ing|ation|ations|er|ers)$"), r"iz\1"),
+    (re.compile(r"ys(e|es|ed|ing)$"), r"yz\1"),
+    (re.compile(r"our(s|ed|ing|ite|ites)?$"), r"or\1"),
+    (re.compile(r"tre(s)?$"), r"ter\1"),
+    (re.compile(r"ogue(s)?$"), r"og\1"),
+]
+
+
+def word_shingles(word):
+    """单词取字符 3-gram"""
+    word = f"^{str(word).strip().lower()}$"
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def meaning_shingles(meaning):
+    """释义去掉交叉引用、词性标记和标点后取汉字 2-gram"""
+    meaning = _REF_PAREN.sub("", str(meaning).lower())
+    meaning = re.sub(r"[a-z]+\.", "", meaning)
+    meaning = re.sub(r"[\s；;，,、。()（）…]", "", meaning)
+    return {meaning[i:i + 2] for i in range(len(meaning) - 1)}
+
+
+def meaning_refs(meaning):
+    """释义中引用的其他单词"""
+    meaning = str(meaning).lower()
+    refs = {m.strip() for m in _REF_EQUAL.findall(meaning)}
+    refs |= set(_REF_FORM.findall(meaning))
+    return refs
+
+
+def spelling_normalize(word):
+    """统一英美拼写差异（-ise/-ize、-yse/-yze、-our/-or、-tre/-ter、-ogue/-og）"""
+    for pattern, repl in _SPELLING:
+        word = pattern.sub(repl, word)
+    return word
+
+
+def stem_key(word):
+    """粗略词干，用于把可能的词形变体分到同一个桶里"""
+    word = spelling_normalize(word)
+    word = re.sub(r"ie[sd]$", "y", word)
+    return re.sub(r"(es|ed|s|d|e)$", "", word)
+
+
+def is_inflection(a, b):
+    """b 是否为 a 的 -s / -es / -ies / -ed / -d / -ied 变形"""
+    if a.endswith("y") and b in (a[:-1] + "ies", a[:-1] + "ied"):
+        return True
+    return b in (a + "s", a + "es", a + "ed", a + "d")
+
+
+def is_variant(a, b):
+    """两个单词是否只差英美拼写或屈折词尾"""
+    a, b = spelling_normalize(a), spelling_normalize(b)
+    return a == b or is_inflection(a, b) or is_inflection(b, a)
+
+
+def minhash(grams):
+    """计算 MinHash 签名，空集合返回 None"""
+    if not grams:
+        return None
+    x = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def common_prefix(a, b):
+    """两个单词的公共前缀长度"""
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class Entry:
+    """一行词表数据及其签名"""
+
+    def __init__(self, word, meaning):
+        self.word = str(word).strip().lower()
+        self.grams = meaning_shingles(meaning)
+        self.refs = meaning_refs(meaning)
+        self.word_sig = minhash(word_shingles(word))
+        self.meaning_sig = minhash(self.grams)
+
+
+def is_near_duplicate(a, b):
+    """判断两行是否为同一个词的变体：
+    1. 释义中交叉引用（等于X / X的复数）直接视为同一个词；
+    2. 只差英美拼写或屈折词尾时接受，释义仅用于否决明显无关的词；
+    3. 其他情况要求释义和拼写都足够相似，且共享词根前缀。没有释义的行不按此规则合并"""
+    if b.word in a.refs or a.word in b.refs:
+        return True
+    if is_variant(a.word, b.word):
+        return not (a.grams and b.grams and jaccard(a.grams, b.grams) < MEANING_VETO)
+    if a.meaning_sig is None or b.meaning_sig is None:
+        return False
+    if np.mean(a.meaning_sig == b.meaning_sig) < MEANING_THRESHOLD:
+        return False
+    if common_prefix(a.word, b.word) < min(MIN_PREFIX, len(a.word), len(b.word)):
+        return False
+    return np.mean(a.word_sig == b.word_sig) >= WORD_THRESHOLD
+
+
+def candidate_buckets(entries):
+    """候选桶：交叉引用对、词干桶、拼写 LSH 桶、释义 LSH 桶（可靠的在前）"""
+    index = {}
+    for idx, entry in enumerate(entries):
+        index.setdefault(entry.word, idx)
+    for idx, entry in enumerate(entries):
+        for ref in entry.refs:
+            if ref in index and index[ref] != idx:
+                yield sorted((idx, index[ref]))
+
+    stems = {}
+    for idx, entry in enumerate(entries):
+        stems.setdefault(stem_key(entry.word), []).append(idx)
+    yield from (b for b in stems.values() if len(b) > 1)
+
+    rows = NUM_PERM // BANDS
+    for attr in ("word_sig", "meaning_sig"):
+        for band in range(BANDS):
+            buckets = {}
+            for idx, entry in enumerate(entries):
+                sig = getattr(entry, attr)
+                if sig is None:
+                    continue
+                buckets.setdefault(sig[band * rows:(band + 1) * rows].tobytes(), []).append(idx)
+            yield from (b for b in buckets.values() if len(b) > 1)
+
+
+def find_clusters(df):
+    """在候选桶内聚类：每行只与簇代表比较，不做传递合并。
+    返回 {代表行下标: [成员行下标...]}"""
+    entries = [Entry(w, m) for w, m in zip(df["word"], df["meaning"])]
+    root = list(range(len(df)))          # 每行所属簇的代表
+    members = {i: [i] for i in range(len(df))}
+
+    for bucket in candidate_buckets(entries):
+        # 先收集桶内所有已成簇的代表，再让剩余的单行逐一与全部代表比较
+        roots = []
+        singles = []
+        for idx in bucket:
+            if root[idx] != idx or len(members[idx]) > 1:
+                if root[idx] not in roots:
+                    roots.append(root[idx])
+            else:
+                singles.append(idx)
+        for idx in singles:
+            for r in roots:
+                if is_near_duplicate(entries[idx], entries[r]):
+                    root[idx] = r
+                    members[r].append(idx)
+                    del members[idx]
+                    break
+            else:
+                roots.append(idx)
+
+    return {r: sorted(m) for r, m in members.items() if len(m) > 1}
+
+
+def pick_representative(df, members):
+    """按 REPRESENTATIVE 策略给出每簇建议保留的行"""
+    if REPRESENTATIVE == "first":
+        return members[0]
+    return min(members, key=lambda i: (len(str(df["word"].iloc[i])), i))
+
+
+def load_words():
+    df = pd.read_csv(input_file, encoding="utf-8")
+    df = df.dropna(subset=["word"]).reset_index(drop=True)
+    df["meaning"] = df["meaning"].fillna("")
+    return df
+
+
+def find():
+    """生成近重复簇明细，不修改词表"""
+    df = load_words()
+    clusters = find_clusters(df)
+
+    report = []
+    for cluster_id, members in enumerate(sorted(clusters.values()), 1):
+        rep = pick_representative(df, members)
+        for i in members:
+            report.append({
+                "cluster": cluster_id,
+                "word": df["word"].iloc[i],
+                "meaning": df["meaning"].iloc[i],
+                "keep": "yes" if i == rep else "no",
+                "approved": "no",
+            })
+    pd.DataFrame(report, columns=["cluster", "word", "meaning", "keep", "approved"]).to_csv(
+        cluster_file, index=False, encoding="utf-8")
+
+    print(f"共找到 {len(clusters)} 个近重复簇（涉及 {len(report)} 个单词），明细见 {cluster_file}。\n"
+          f"复核后把要合并的簇 approved 改为 yes（可调整 keep），再运行 python NearDedupe.py apply")
+
+
+def apply():
+    """只删除已批准簇中 keep=no 的单词；每个批准的簇必须恰好保留一个单词，否则跳过"""
+    df = load_words()
+    clusters = pd.read_csv(cluster_file, encoding="utf-8", dtype=str).fillna("")
+    clusters["approved"] = clusters["approved"].str.strip().str.lower()
+    clusters["keep"] = clusters["keep"].str.strip().str.lower()
+
+    drop = set()
+    applied = 0
+    for cluster_id, group in clusters.groupby("cluster", sort=False):
+        approved = set(group["approved"])
+        if approved == {"no"} or approved == {""}:
+            continue
+        if approved != {"yes"}:
+            print(f"⚠️ 跳过簇 {cluster_id}：approved 列不一致（{'/'.join(group['word'])}）")
+            continue
+        kept = group.loc[group["keep"] == "yes", "word"].tolist()
+        if len(kept) != 1 or not set(group["keep"]) <= {"yes", "no"}:
+            print(f"⚠️ 跳过簇 {cluster_id}：keep=yes 必须恰好一个，当前为 {kept or '无'}")
+            continue
+        drop |= set(group.loc[group["keep"] == "no", "word"])
+        applied += 1
+
+    deduped = df[~df["word"].isin(drop)]
+    deduped.to_csv(output_file, index=False, encoding="utf-8")
+
+    print(f"已应用 {applied} 个批准的簇！原来 {len(df)} 条，"
+          f"合并后 {len(deduped)} 条，输出到 {output_file}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "apply":
+        apply()
+    else:
+        find()
@@ -1,8 +1,13 @@
+import os
+import sys
 import csv
 import json
 import time
 from kimiv2 import explain_word  # 导入模块化的函数
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from work_queue import WorkQueue, LeaseHeartbeat, default_worker_id
+
 class TimeoutException(Exception):
     print("链接超时")
     pass
@@ -38,6 +43,42 @@ def batch_process(csv_in, jsonl_out, timeout=60, rate=1.0):
 
     print(f"Done! Processed {idx} words, results appended to {jsonl_out}")
 
+def batch_process_sharded(db_path, worker_id=None, batch_size=10, rate=1.0):
+    """分片模式：从共享的 SQLite 队列领取单词，可同时运行多个进程/多台机器。
+    每个进程可通过 MOONSHOT_API_KEY 使用不同的 API Key；
+    全部完成后用 `python work_queue.py export <db> <jsonl>` 按固定顺序合并结果。"""
+    worker_id = worker_id or default_worker_id()
+    queue = WorkQueue(db_path)
+    done = 0
+
+    try:
+        with LeaseHeartbeat(queue, worker_id) as heartbeat:
+            try:
+                while True:
+                    batch = queue.claim(worker_id, batch_size)
+                    if not batch:
+                        break
+                    heartbeat.track(w for w, _ in batch)
+                    for word, _ in batch:
+                        print(f"[{worker_id}] Processing: {word}")
+                        try:
+                            res = explain_word(word)
+                            if queue.complete(worker_id, word, res):
+                                done += 1
+                            else:
+                                print(f"  Lease lost: {word}")
+                        except Exception as e:
+                            print(f"  Error: {word} -> {e}")
+                            queue.fail(worker_id, word, e)
+                        heartbeat.untrack(word)
+                        time.sleep(rate)
+            finally:
+                # 中断退出时立即归还未完成的单词，不必等租约过期
+                queue.release(worker_id, heartbeat.tracked())
+        print(f"Done! Worker {worker_id} processed {done} words, queue status: {queue.stats()}")
+    finally:
+        queue.close()
+
 # if __name__ == "__main__":
 #     parser = argparse.ArgumentParser()
 #     parser.add_argument("csv_in", help="Input unmatched words CSV")
@@ -57,5 +98,10 @@ if __name__ == "__main__":
     timeout = 60   # 每个单词超时时间（秒）
     rate = 1.0     # 请求之间的延迟（秒）
 
-    batch_process(csv_in, jsonl_out, timeout, rate)
+    # 分片模式：先 python ../work_queue.py seed queue.db unmatched.csv，
+    # 再在各进程中运行 python batch_process.py queue.db
+    if len(sys.argv) > 1:
+        batch_process_sharded(sys.argv[1], rate=rate)
+    else:
+        batch_process(csv_in, jsonl_out, timeout, rate)
 
@@ -9,20 +9,27 @@ from aiohttp import ClientSession, ClientError, ClientResponseError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from functools import lru_cache
 import threading
+import atexit
 from queue import Queue
+from logging.handlers import QueueHandler, QueueListener
 import numpy as np
 from tqdm import tqdm
 import hashlib
+import shutil
+from prompt_templates import get_template
+from work_queue import WorkQueue, LeaseHeartbeat, default_worker_id
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("word_processing.log"),
-        logging.StreamHandler()
-    ]
-)
+# 配置日志：事件循环只把日志记录放入队列，由监听线程负责写文件/控制台
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler("word_processing.log", encoding="utf-8")
+_file_handler.setFormatter(_log_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_log_formatter)
+_log_queue = Queue(-1)
+_log_listener = QueueListener(_log_queue, _file_handler, _stream_handler, respect_handler_level=True)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("WordMemory")
 
 # 全局配置
@@ -32,11 +39,74 @@ CONFIG = {
     "RETRY_ATTEMPTS": 3,       # 最大重试次数
     "MIN_DELAY": 0.5,          # 最小延迟(秒)
     "MAX_DELAY": 5.0,          # 最大延迟(秒)
+    "FLUSH_INTERVAL": 5.0,     # 进度/缓存文件最短重写间隔(秒)
     "PROGRESS_FILE": "progress.json",
     "CACHE_FILE": "word_cache.json",
     "MODEL_SELECTION_THRESHOLD": 0.7,  # 用于模型选择的阈值
+    "PROMPT_TEMPLATE": "word_brief",   # 提示词模板名，见 prompt_templates.py
+    "PROMPT_VERSION": 1,               # 固定模板版本，升级时显式修改
 }
 
+class AsyncFileWriter:
+    """后台写盘线程：调用方只标记文件为“脏”，由写盘线程生成快照并合并写入，避免阻塞事件循环"""
+
+    def __init__(self, flush_interval=CONFIG["FLUSH_INTERVAL"]):
+        self.flush_interval = flush_interval
+        self.cond = threading.Condition()
+        self.dirty = {}   # path -> (snapshot_fn, dump_kwargs)，待写文件数不超过文件种类数
+        self.closed = False
+        self.write_count = 0
+        self.coalesced_count = 0
+        self.thread = threading.Thread(target=self._run, name="AsyncFileWriter", daemon=True)
+        self.thread.start()
+
+    def mark_dirty(self, path, snapshot_fn, **dump_kwargs):
+        """标记文件需要重写，O(1) 且不会阻塞；快照在写盘线程中生成，总是最新状态"""
+        with self.cond:
+            if path in self.dirty:
+                self.coalesced_count += 1
+            self.dirty[path] = (snapshot_fn, dump_kwargs)
+            self.cond.notify()
+
+    def close(self):
+        """写完所有脏文件后停止线程"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+
+    def _run(self):
+        last_flush = 0.0
+        while True:
+            with self.cond:
+                while not self.dirty and not self.closed:
+                    self.cond.wait()
+                # 两次写盘至少间隔 flush_interval，期间的修改合并到下一次写入；关闭时立即写
+                while not self.closed:
+                    remaining = last_flush + self.flush_interval - time.time()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                pending, self.dirty = self.dirty, {}
+                closed = self.closed
+            last_flush = time.time()
+            for path, (snapshot_fn, dump_kwargs) in pending.items():
+                self._write(path, snapshot_fn, dump_kwargs)
+            if closed and not pending:
+                break
+
+    def _write(self, path, snapshot_fn, dump_kwargs):
+        """生成快照后先写临时文件再替换，避免中途崩溃留下半个文件；任何异常都不会终止写盘线程"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            data = snapshot_fn()
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, **dump_kwargs)
+            os.replace(tmp_path, path)
+            self.write_count += 1
+        except Exception as e:
+            logger.error(f"写入文件失败 [{path}]: {str(e)}")
+
 class APIManager:
     """管理API调用，处理配额、限流和错误"""
     
@@ -50,6 +120,7 @@ class APIManager:
         self.call_lock = threading.Lock()
         self.rate_limit = 5  # 默认QPS
         self.dynamic_delay = CONFIG["MIN_DELAY"]
+        self.prompt = get_template(CONFIG["PROMPT_TEMPLATE"], CONFIG["PROMPT_VERSION"])
         
     def update_rate_limit(self, new_limit):
         """动态更新速率限制"""
@@ -91,7 +162,7 @@ class APIManager:
             async with ClientSession() as session:
                 response = await self.dashscope.Generation.acall(
                     model=model,
-                    prompt=self._build_prompt(word_data),
+                    messages=self._build_messages(word_data),
                     temperature=0.6,
                     api_key=self.api_key,
                     session=session
@@ -115,83 +186,108 @@ class APIManager:
             logger.error(f"API调用异常: {str(e)}")
             raise
 
-    def _build_prompt(self, word_data):
-        """构建优化的提示词，减少token使用"""
-        return f"""
-        请简洁但全面地分析以下英语单词，格式严格遵循要求：
-        
-        {word_data}
-        
-        ### 分析词义
-        [简明列出主要含义，3-5点]
-        
-        ### 列举例句
-        [4个实用例句，中英文对照]
-        
-        ### 词根词缀
-        [词根+词缀分析，不超过2句]
-        
-        ### 记忆技巧
-        [1个核心记忆点+小故事]
-        
-        注意：内容要精炼实用，避免冗长，总字数控制在300-500字。
-        """
+    def _build_messages(self, word_data):
+        """构建消息：固定的精简模板作为 system 前缀，单词数据放在 user 中"""
+        return self.prompt.build_messages(word_data)
 
 class WordProcessor:
     """单词处理核心类，管理处理流程"""
     
-    def __init__(self, api_manager, csv_path):
+    def __init__(self, api_manager, csv_path, persist_local=True):
         self.api_manager = api_manager
         self.csv_path = csv_path
+        self.prompt_tag = api_manager.prompt.tag
+        # 分片模式下队列数据库是唯一的进度存储，不读写本地进度/缓存文件
+        self.persist_local = persist_local
         self.progress = self._load_progress()
         self.word_cache = self._load_cache()
         self.processed_words = set(self.progress.get("processed", []))
         self.total_words = 0
         self.processed_count = len(self.processed_words)
         self.error_words = self.progress.get("errors", [])
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()
+        self.writer = AsyncFileWriter()
         
     def _load_progress(self):
         """加载处理进度"""
-        if os.path.exists(CONFIG["PROGRESS_FILE"]):
+        if self.persist_local and os.path.exists(CONFIG["PROGRESS_FILE"]):
             try:
                 with open(CONFIG["PROGRESS_FILE"], "r") as f:
-                    return json.load(f)
+                    progress = json.load(f)
+                if "prompt" not in progress:
+                    # 旧版进度文件没有模板标识，沿用其进度，避免升级后重复请求已处理的单词
+                    logger.warning(f"进度文件没有提示词模板标识（旧版格式），沿用已有进度并视为 {self.prompt_tag} 生成")
+                    return progress
+                # 进度来自其他提示词模板时不能复用，否则会混入旧模板的结果
+                if progress["prompt"] != self.prompt_tag:
+                    backup = self._backup_file(CONFIG["PROGRESS_FILE"])
+                    logger.warning(f"进度文件的提示词模板 {progress['prompt']} 与当前 {self.prompt_tag} 不一致，"
+                                   f"忽略已有进度，原文件已备份为 {backup}")
+                    return {"processed": [], "errors": []}
+                return progress
             except:
                 return {"processed": [], "errors": []}
         return {"processed": [], "errors": []}
     
-    def _save_progress(self):
-        """保存处理进度"""
+    def _backup_file(self, path):
+        """覆盖前备份文件"""
+        backup = f"{path}.bak"
+        shutil.copy2(path, backup)
+        return backup
+
+    def _progress_snapshot(self):
+        """生成进度快照（在写盘线程中调用）"""
         with self.lock:
-            progress = {
+            return {
                 "processed": list(self.processed_words),
-                "errors": self.error_words,
+                "errors": list(self.error_words),
+                "prompt": self.prompt_tag,
                 "timestamp": time.time()
             }
-            with open(CONFIG["PROGRESS_FILE"], "w") as f:
-                json.dump(progress, f, indent=2)
+
+    def _save_progress(self):
+        """保存处理进度（标记给后台写盘线程）"""
+        if self.persist_local:
+            self.writer.mark_dirty(CONFIG["PROGRESS_FILE"], self._progress_snapshot, indent=2)
     
     def _load_cache(self):
         """加载缓存"""
         cache = {}
-        if os.path.exists(CONFIG["CACHE_FILE"]):
+        if self.persist_local and os.path.exists(CONFIG["CACHE_FILE"]):
             try:
-                with open(CONFIG["CACHE_FILE"], "r") as f:
+                with open(CONFIG["CACHE_FILE"], "r", encoding="utf-8") as f:
                     cache_data = json.load(f)
-                    # 转换为需要的格式
-                    for item in cache_data:
-                        cache[item["word"]] = item["content"]
+                # 按缓存键索引；其他模板的条目保留在文件中，但键不同不会命中
+                for item in cache_data:
+                    if "key" in item:
+                        cache[item["key"]] = item
+                # 旧版缓存条目没有缓存键，下次写盘时会被丢弃，先备份原文件
+                if len(cache) < len(cache_data):
+                    backup = self._backup_file(CONFIG["CACHE_FILE"])
+                    logger.warning(f"缓存文件中有 {len(cache_data) - len(cache)} 条旧版条目无法复用，原文件已备份为 {backup}")
             except:
                 pass
         return cache
     
-    def _save_cache(self, word, content):
-        """保存到缓存"""
-        self.word_cache[word] = content
-        cache_data = [{"word": w, "content": c} for w, c in self.word_cache.items()]
-        with open(CONFIG["CACHE_FILE"], "w") as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+    def _cache_snapshot(self):
+        """生成缓存快照（在写盘线程中调用）"""
+        with self.lock:
+            return [dict(item, key=k) for k, item in self.word_cache.items()]
+
+    def _save_cache(self, cache_key, word, content):
+        """保存到缓存（标记给后台写盘线程）"""
+        with self.lock:
+            self.word_cache[cache_key] = {"word": word, "prompt": self.prompt_tag, "content": content}
+        if self.persist_local:
+            self.writer.mark_dirty(CONFIG["CACHE_FILE"], self._cache_snapshot, ensure_ascii=False, indent=2)
+
+    def close(self):
+        """保存最终进度和缓存，并等待所有写盘任务完成"""
+        if self.persist_local:
+            self._save_progress()
+            self.writer.mark_dirty(CONFIG["CACHE_FILE"], self._cache_snapshot, ensure_ascii=False, indent=2)
+        self.writer.close()
+        logger.info(f"写盘统计: 实际写入 {self.writer.write_count} 次，合并 {self.writer.coalesced_count} 次")
     
     def _is_word_processed(self, word):
         """检查单词是否已处理"""
@@ -230,16 +326,16 @@ class WordProcessor:
         if cache_key in self.word_cache:
             logger.info(f"使用缓存结果: {word}")
             self._mark_as_processed(word)
-            return {"word": word, "content": self.word_cache[cache_key]}
+            return {"word": word, "content": self.word_cache[cache_key]["content"], "prompt": self.prompt_tag}
         
         try:
             # 调用API
             content = await self.api_manager.call_api(word_data)
             
             # 保存结果
-            result = {"word": word, "content": content}
+            result = {"word": word, "content": content, "prompt": self.prompt_tag}
             self._mark_as_processed(word)
-            self._save_cache(word, content)
+            self._save_cache(cache_key, word, content)
             
             return result
             
@@ -249,8 +345,8 @@ class WordProcessor:
             return None
     
     def _get_cache_key(self, word_data):
-        """生成缓存键"""
-        return hashlib.md5(word_data.encode()).hexdigest()
+        """生成缓存键（包含提示词模板标识）"""
+        return hashlib.md5(f"{self.prompt_tag}\n{word_data}".encode()).hexdigest()
     
     async def process_batch(self, word_data_list):
         """处理一批单词"""
@@ -317,13 +413,73 @@ class WordProcessor:
         self._save_progress()
         return results
 
+    async def _process_claimed(self, queue, worker_id, word, definition):
+        """处理分片模式下领取到的单词，并把结果提交回队列"""
+        loop = asyncio.get_running_loop()
+        word_data = f"{word},{definition}"
+        try:
+            content = await self.api_manager.call_api(word_data)
+        except Exception as e:
+            status = await loop.run_in_executor(None, queue.fail, worker_id, word, e)
+            # 放回队列的单词之后可能成功，只记录最终失败的
+            if status == "failed":
+                self._add_error(word, e)
+            logger.error(f"处理单词失败 [{word}]: {str(e)}")
+            return None
+
+        result = {"word": word, "content": content, "prompt": self.prompt_tag}
+        if not await loop.run_in_executor(None, queue.complete, worker_id, word, result):
+            logger.warning(f"租约已失效，结果未提交: {word}")
+            return None
+        self._mark_as_processed(word)
+        self._save_cache(self._get_cache_key(word_data), word, content)
+        return result
+
+    async def process_sharded(self, queue, worker_id=None):
+        """分片模式：从共享队列按批领取单词，多个进程/主机可同时处理同一词表"""
+        loop = asyncio.get_running_loop()
+        worker_id = worker_id or default_worker_id()
+
+        # 导入词表（已存在的单词会被忽略，每个进程重复导入也安全）
+        df = pd.read_csv(self.csv_path)
+        self.total_words = len(df)
+        added = await loop.run_in_executor(None, queue.seed, list(zip(df['word'], df['definition'].fillna(''))))
+        logger.info(f"[{worker_id}] 队列新增 {added} 个单词，当前状态: {queue.stats()}")
+
+        results = []
+        pbar = tqdm(desc=f"处理单词[{worker_id}]")
+        with LeaseHeartbeat(queue, worker_id) as heartbeat:
+            try:
+                while True:
+                    batch = await loop.run_in_executor(None, queue.claim, worker_id, CONFIG["BATCH_SIZE"])
+                    if not batch:
+                        break
+                    heartbeat.track(word for word, _ in batch)
+                    tasks = [self._process_claimed(queue, worker_id, word, definition) for word, definition in batch]
+                    for f in asyncio.as_completed(tasks):
+                        result = await f
+                        if result:
+                            results.append(result)
+                    for word, _ in batch:
+                        heartbeat.untrack(word)
+                    pbar.update(len(batch))
+            finally:
+                # 中断或异常退出时立即归还未完成的单词，不必等租约过期
+                queue.release(worker_id, heartbeat.tracked())
+
+        pbar.close()
+        logger.info(f"[{worker_id}] 队列已无可领取单词，当前状态: {queue.stats()}")
+        return results
+
 class OptimizedWordMemoryApp:
     """优化版单词记忆应用入口"""
     
-    def __init__(self, api_key, csv_path, output_file="word_memory.json"):
+    def __init__(self, api_key, csv_path, output_file="word_memory.json", work_db=None):
         self.api_manager = APIManager(api_key)
-        self.processor = WordProcessor(self.api_manager, csv_path)
+        self.processor = WordProcessor(self.api_manager, csv_path, persist_local=not work_db)
         self.output_file = output_file
+        self.work_db = work_db
+        self.worker_id = default_worker_id() if work_db else None
         
     async def run(self):
         """运行处理流程"""
@@ -332,7 +488,18 @@ class OptimizedWordMemoryApp:
         logger.info(f"输出文件: {self.output_file}")
         
         start_time = time.time()
-        results = await self.processor.process_all()
+        queue = WorkQueue(self.work_db) if self.work_db else None
+        try:
+            if queue:
+                logger.info(f"分片模式，队列数据库: {self.work_db}")
+                results = await self.processor.process_sharded(queue, self.worker_id)
+            else:
+                results = await self.processor.process_all()
+        finally:
+            if queue:
+                queue.close()
+            # 在线程池中等待写盘线程清空队列
+            await asyncio.get_running_loop().run_in_executor(None, self.processor.close)
         
         # 保存最终结果
         if results:
@@ -348,7 +515,7 @@ class OptimizedWordMemoryApp:
         
         # 错误报告
         if self.processor.error_words:
-            error_file = "error_words.json"
+            error_file = f"error_words.{self.worker_id}.json" if self.worker_id else "error_words.json"
             with open(error_file, 'w') as f:
                 json.dump(self.processor.error_words, f, indent=2)
             logger.warning(f"共 {len(self.processor.error_words)} 个单词处理失败，详情见 {error_file}")
@@ -371,6 +538,11 @@ def main():
     # 配置文件路径
     csv_path = "words.csv"  # 你的6000+单词CSV文件
     output_file = "word_memory.json"
+    # 分片模式：多个进程/主机设置相同的 WORD_QUEUE_DB（各自可用不同的 API Key），
+    # 完成后用 python work_queue.py export <db> <jsonl> 按固定顺序合并结果
+    work_db = os.getenv("WORD_QUEUE_DB")
+    if work_db:
+        output_file = f"word_memory.{default_worker_id()}.json"
     
     # 检查CSV文件
     if not os.path.exists(csv_path):
@@ -379,7 +551,7 @@ def main():
         return
     
     # 运行应用
-    app = OptimizedWordMemoryApp(api_key, csv_path, output_file)
+    app = OptimizedWordMemoryApp(api_key, csv_path, output_file, work_db)
     asyncio.run(app.run())
     
     logger.info("===== 单词处理流程结束 =====")
@@ -0,0 +1,151 @@
+import re
+import sys
+import hashlib
+import textwrap
+
+# 统一的提示词模板注册表：各个 provider 都从这里取系统提示词，
+# 保证每次请求的 system 前缀逐字节一致，命中服务端的前缀/上下文缓存。
+# 可变内容（单词、释义）一律放在最后的 user 消息中，不要拼进 system。
+
+
+def normalize(text):
+    """去掉公共缩进、行尾空格和多余空行，避免无意义的 token"""
+    text = textwrap.dedent(text)
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数：汉字及中文标点约 1 token/字，其余约 4 字符/token"""
+    cjk = len(re.findall(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]", text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class PromptTemplate:
+    """单个版本的提示词模板"""
+
+    def __init__(self, name, version, system, user_format="{content}"):
+        self.name = name
+        self.version = version
+        self.system = normalize(system)
+        self.user_format = user_format
+        self.fingerprint = hashlib.sha1(self.system.encode("utf-8")).hexdigest()[:12]
+        # 结果/缓存上记录的模板标识，版本或内容变化都会改变它
+        self.tag = f"{name}/v{version}/{self.fingerprint}"
+        self.token_count = estimate_tokens(self.system)
+
+    def build_messages(self, content):
+        """固定布局：system 在前（可缓存前缀），变化的内容在后"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_format.format(content=str(content).strip())},
+        ]
+
+
+_REGISTRY = {}
+
+
+def register(name, version, system, user_format="{content}"):
+    """注册模板，同名同版本不允许覆盖，修改内容请升版本号"""
+    key = (name, version)
+    if key in _REGISTRY:
+        raise ValueError(f"模板已存在: {name} v{version}")
+    _REGISTRY[key] = PromptTemplate(name, version, system, user_format)
+    return _REGISTRY[key]
+
+
+def get_template(name, version=None):
+    """获取模板，不指定版本时返回最新版本"""
+    if version is not None:
+        try:
+            return _REGISTRY[(name, version)]
+        except KeyError:
+            raise KeyError(f"未找到模板: {name} v{version}") from None
+    versions = [v for (n, v) in _REGISTRY if n == name]
+    if not versions:
+        raise KeyError(f"未找到模板: {name}")
+    return _REGISTRY[(name, max(versions))]
+
+
+def list_templates():
+    """列出所有模板"""
+    return [_REGISTRY[key] for key in sorted(_REGISTRY)]
+
+
+# 完整版：Kimi 批量生成使用，word_prompt.md 由此导出
+register("word_full", 1, """
+你是一名中英文双语教育专家，拥有帮助将中文视为母语的用户理解和记忆英语单词的专长，请根据用户提供的英语单词完成下列任务。
+### 音标
+- 英音美音的音标标注
+
+### 一词多义
+- 列出单词的多种常用的含义。
+
+### 分析词义
+- 系统地分析用户提供的英文单词，并以简单易懂的方式解答；
+
+### 列举例句
+- 根据所需，为该单词提供至少 3 个不同场景下的使用方法和例句。并且附上中文翻译，以帮助用户更深入地理解单词意义。
+
+### 词根分析
+- 分析并展示单词的词根；
+- 列出由词根衍生出来的其他单词；
+
+### 词缀分析
+- 分析并展示单词的词缀，例如：单词 individual，前缀 in- 表示否定，-divid- 是词根，-u- 是中缀，用于连接和辅助发音，-al 是后缀，表示形容词；
+- 列出相同词缀的的其他单词；
+
+### 发展历史和文化背景
+- 详细介绍单词的造词来源和发展历史，以及在欧美文化中的内涵
+
+### 单词变形
+- 列出单词对应的名词、单复数、动词、不同时态、形容词、副词等的变形以及对应的中文翻译。
+- 列出单词对应的固定搭配、组词以及对应的中文翻译。
+
+### 记忆辅助
+- 提供一些高效的记忆技巧和窍门，以更好地记住英文单词。
+
+### 小故事
+- 用英文撰写一个有画面感的场景故事，包含用户提供的单词。
+- 要求使用简单的词汇，100 个单词以内。
+- 英文故事后面附带对应的中文翻译。
+""")
+
+# 精简版：QwenLLM 大批量处理使用，控制输出长度
+register("word_brief", 1, """
+请简洁但全面地分析用户提供的英语单词（格式：单词,释义），格式严格遵循要求：
+
+### 分析词义
+[简明列出主要含义，3-5点]
+
+### 列举例句
+[4个实用例句，中英文对照]
+
+### 词根词缀
+[词根+词缀分析，不超过2句]
+
+### 记忆技巧
+[1个核心记忆点+小故事]
+
+注意：内容要精炼实用，避免冗长，总字数控制在300-500字。
+""")
+
+
+# Kimi 批量生成固定使用的版本，升级模板时修改此处（kimiv2.py 与 word_prompt.md 都跟随它）
+WORD_FULL_VERSION = 1
+
+
+def export_markdown(path="word_prompt.md", name="word_full", version=WORD_FULL_VERSION):
+    """把指定版本的模板导出为 Markdown，保持 word_prompt.md 与实际发送的提示词一致"""
+    template = get_template(name, version)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(template.system + "\n")
+    return template
+
+
+if __name__ == "__main__":
+    if "--export" in sys.argv:
+        t = export_markdown()
+        print(f"已导出 word_prompt.md（{t.name} v{t.version}）")
+    for t in list_templates():
+        print(f"{t.name} v{t.version}  指纹 {t.fingerprint}  约 {t.token_count} tokens")
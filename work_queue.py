@@ -0,0 +1,236 @@
+import os
+import sys
+import csv
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+# 基于 SQLite 租约表的分片工作队列：多个进程（可各自使用不同 API Key）
+# 从同一个数据库领取单词，领取时加租约，处理期间定时心跳续约，
+# 进程崩溃后租约过期的单词会被其他进程重新领取，已完成的单词不会被重复请求。
+# 多台机器共用时：
+# - 数据库放在支持 POSIX 文件锁的共享存储上，使用默认的回滚日志模式（journal_mode=DELETE）。
+#   WAL 模式依赖同一台机器上的共享内存，不能用于网络文件系统，只在单机多进程时用 wal=True 开启。
+# - 租约到期时间取自各工作者本机的 time.time()，各主机必须做时钟同步（NTP）。
+#   时钟偏差接近租约时长时，其他主机会提前回收仍在处理中的租约，导致同一个单词被重复请求。
+
+LEASE_SECONDS = 300       # 租约时长(秒)
+HEARTBEAT_SECONDS = 60    # 心跳间隔(秒)，应明显小于租约时长
+MAX_ATTEMPTS = 3          # 单个单词最多尝试次数，超过后标记为 failed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    word TEXT UNIQUE NOT NULL,
+    payload TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_words_status ON words (status, lease_until);
+"""
+
+
+def default_worker_id():
+    """默认工作者标识：主机名-进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """单词租约队列"""
+
+    def __init__(self, db_path, lease_seconds=LEASE_SECONDS, wal=False):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        # 默认回滚日志，可用于多主机共享存储；WAL 仅适用于单机
+        self.conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _transaction(self, fn):
+        """在 BEGIN IMMEDIATE 事务中执行，保证领取操作在多进程间互斥"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def seed(self, items):
+        """导入 (word, payload) 列表，已存在的单词忽略；返回新增数量"""
+        rows = [(str(w).strip(), "" if p is None else str(p)) for w, p in items if str(w).strip()]
+
+        def op(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO words (word, payload) VALUES (?, ?)", rows)
+            return conn.total_changes - before
+        return self._transaction(op)
+
+    def claim(self, worker_id, limit=1):
+        """领取最多 limit 个待处理或租约已过期的单词，返回 [(word, payload), ...]"""
+        def op(conn):
+            now = time.time()
+            rows = conn.execute(
+                "SELECT seq, word, payload FROM words "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY seq LIMIT ?", (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE words SET status = 'leased', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated = ? WHERE seq = ?",
+                [(worker_id, now + self.lease_seconds, now, seq) for seq, _, _ in rows])
+            return [(word, payload) for _, word, payload in rows]
+        return self._transaction(op)
+
+    def heartbeat(self, worker_id, words):
+        """为仍由本工作者持有的单词续约，返回续约成功的数量"""
+        def op(conn):
+            now = time.time()
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE words SET lease_until = ?, updated = ? "
+                "WHERE word = ? AND worker = ? AND status = 'leased'",
+                [(now + self.lease_seconds, now, w, worker_id) for w in words])
+            return conn.total_changes - before
+        return self._transaction(op)
+
+    def complete(self, worker_id, word, result):
+        """提交结果；租约已被他人接管时返回 False，结果不会写入"""
+        def op(conn):
+            cur = conn.execute(
+                "UPDATE words SET status = 'done', result = ?, error = NULL, updated = ? "
+                "WHERE word = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result, ensure_ascii=False), time.time(), word, worker_id))
+            return cur.rowcount == 1
+        return self._transaction(op)
+
+    def fail(self, worker_id, word, error, max_attempts=MAX_ATTEMPTS):
+        """记录失败：未超过尝试次数则放回队列，否则标记为 failed。
+        返回单词的新状态（pending / failed），租约已被他人接管时返回 None"""
+        def op(conn):
+            cur = conn.execute(
+                "UPDATE words SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, lease_until = 0, error = ?, updated = ? "
+                "WHERE word = ? AND worker = ? AND status = 'leased'",
+                (max_attempts, str(error), time.time(), word, worker_id))
+            if cur.rowcount != 1:
+                return None
+            return conn.execute("SELECT status FROM words WHERE word = ?", (word,)).fetchone()[0]
+        return self._transaction(op)
+
+    def release(self, worker_id, words):
+        """主动归还未处理的单词（不计入失败），用于中断退出时立即释放租约"""
+        def op(conn):
+            conn.executemany(
+                "UPDATE words SET status = 'pending', worker = NULL, lease_until = 0, "
+                "attempts = MAX(attempts - 1, 0), updated = ? "
+                "WHERE word = ? AND worker = ? AND status = 'leased'",
+                [(time.time(), w, worker_id) for w in words])
+        self._transaction(op)
+
+    def stats(self):
+        """各状态的单词数量"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM words GROUP BY status").fetchall())
+
+    def export_jsonl(self, path):
+        """按导入顺序导出已完成的结果，多个工作者的输出合并后顺序固定"""
+        with self.lock:
+            rows = self.conn.execute("SELECT result FROM words WHERE status = 'done' ORDER BY seq").fetchall()
+        with open(path, "w", encoding="utf-8") as f:
+            for (result,) in rows:
+                f.write(json.dumps(json.loads(result), ensure_ascii=False) + "\n")
+        return len(rows)
+
+
+class LeaseHeartbeat:
+    """后台心跳线程，定时为当前持有的单词续约"""
+
+    def __init__(self, queue, worker_id, interval=HEARTBEAT_SECONDS):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.interval = interval
+        self.words = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="LeaseHeartbeat", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+    def track(self, words):
+        with self.lock:
+            self.words.update(words)
+
+    def untrack(self, word):
+        with self.lock:
+            self.words.discard(word)
+
+    def tracked(self):
+        """当前仍持有租约的单词"""
+        with self.lock:
+            return list(self.words)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                words = list(self.words)
+            if words:
+                try:
+                    self.queue.heartbeat(self.worker_id, words)
+                except sqlite3.Error as e:
+                    print(f"⚠️ 心跳续约失败: {e}")
+
+
+def load_csv(path):
+    """读取 word,meaning 格式的 CSV（有无表头均可）"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for idx, row in enumerate(csv.reader(f)):
+            if not row or (idx == 0 and row[0].strip().lower() == "word"):
+                continue
+            items.append((row[0], row[1] if len(row) > 1 else ""))
+    return items
+
+
+if __name__ == "__main__":
+    usage = ("用法:\n"
+             "  python work_queue.py seed <queue.db> <words.csv>\n"
+             "  python work_queue.py stats <queue.db>\n"
+             "  python work_queue.py export <queue.db> <output.jsonl>")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("seed", "stats", "export"):
+        print(usage)
+        sys.exit(1)
+
+    command, db_path = sys.argv[1], sys.argv[2]
+    queue = WorkQueue(db_path)
+    if command == "seed" and len(sys.argv) > 3:
+        added = queue.seed(load_csv(sys.argv[3]))
+        print(f"✅ 导入完成，新增 {added} 个单词")
+    elif command == "export" and len(sys.argv) > 3:
+        count = queue.export_jsonl(sys.argv[3])
+        print(f"✅ 导出 {count} 条结果到 {sys.argv[3]}")
+    elif command == "stats":
+        print(json.dumps(queue.stats(), ensure_ascii=False))
+    else:
+        print(usage)
+        sys.exit(1)
+    queue.close()